@@ -1,16 +1,12 @@
 # app.py
-import re
+import io
 import time
 import random
-from urllib.parse import urlparse
-from typing import Optional, Tuple, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List
 
 import pandas as pd
-import requests
 import streamlit as st
-from bs4 import BeautifulSoup
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
 # ------------- Gmail SMTP (no SendGrid) -------------
 import smtplib, ssl
@@ -28,252 +24,55 @@ REPLY_TO = st.secrets.get("REPLY_TO", "info@miamimasterflooring.com")
 GMAIL_USER = st.secrets.get("GMAIL_USER", SENDER_EMAIL)  # SMTP login user (can be same)
 GMAIL_APP_PASSWORD = st.secrets.get("GMAIL_APP_PASSWORD", "")  # Google App Password
 
-EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
-PHONE_RE = re.compile(r"(?:\+1[\s\-.]?)?(?:\(?\d{3}\)?[\s\-.]?)\d{3}[\s\-.]?\d{4}")
-SOCIAL_AGG_DOMAINS = (
-    "facebook.com", "instagram.com", "linkedin.com", "twitter.com", "x.com",
-    "youtube.com", "yelp.com", "angieslist.com", "houzz.com", "pinterest.com",
-    "tiktok.com", "homeadvisor.com", "thumbtack.com", "porch.com", "bbb.org"
+from crawler import (
+    EMAIL_RE,
+    HTTP,
+    batched_query,
+    canonical_url,
+    domain_of,
+    is_excluded_domain,
+    is_generic_email,
+    is_generic_local,
+    iter_queries,
+    parse_email,
+    probe_site,
+    search_bing_api,
+    search_serp_api,
+    verify_domain_mx,
+    verify_email_mx,
 )
-EXCLUDE_DOMAINS = (
-    "google.com", "maps.google.com", "duckduckgo.com", "bing.com",
-    "support.google.com", "developers.google.com", "webcache.googleusercontent.com",
-)
-GENERIC_PREFIXES = {"info", "contact", "sales", "hello", "admin", "support", "office", "team"}
-
-# Session-state DF
-if "leads" not in st.session_state:
-    st.session_state.leads = pd.DataFrame(columns=["Company", "Email", "Website", "Phone", "Source"])
-
-# ---------------------- Robust HTTP session ----------------------
-@st.cache_resource(show_spinner=False)
-def _session_with_retries():
-    s = requests.Session()
-    r = Retry(
-        total=6, connect=3, read=3, status=3,
-        backoff_factor=0.7,
-        status_forcelist=(429, 500, 502, 503, 504),
-        allowed_methods=frozenset(["GET", "POST"]),
-        raise_on_status=False,
-    )
-    s.mount("http://", HTTPAdapter(max_retries=r))
-    s.mount("https://", HTTPAdapter(max_retries=r))
-    s.headers.update({
-        "User-Agent": random.choice([
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/123 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_5) AppleWebKit/605.1.15 Safari/605.1.15",
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/123 Safari/537.36"
-        ]),
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Connection": "keep-alive",
-    })
-    return s
-
-HTTP = _session_with_retries()
-
-# ---------------------- Helpers ----------------------
-def domain_of(u: str) -> str:
-    try:
-        d = urlparse(u).netloc.lower()
-        return d[4:] if d.startswith("www.") else d
-    except Exception:
-        return ""
-
-def is_generic_email(email: str) -> bool:
-    try:
-        local, _ = email.split("@", 1)
-        return local.lower() in GENERIC_PREFIXES
-    except Exception:
-        return False
 
-def looks_like_business_site(u: str) -> bool:
-    d = domain_of(u)
-    if not d:
-        return False
-    if any(s in d for s in SOCIAL_AGG_DOMAINS):
-        return False
-    if any(d.endswith(x) or d == x for x in EXCLUDE_DOMAINS):
-        return False
-    if any(d.endswith(tld) for tld in (".com", ".net", ".org", ".io", ".co", ".us")):
-        return True
-    return False
-
-@st.cache_data(show_spinner=False)
-def verify_email_mx(email: str) -> bool:
-    """DNS-over-HTTPS MX check via Google DNS; permissive on failure."""
-    try:
-        d = email.split("@", 1)[1]
-        r = HTTP.get(f"https://dns.google/resolve?name={d}&type=MX", timeout=5)
-        if not r.ok:
-            return True  # don't over-block on transient errors
-        j = r.json()
-        return bool(j.get("Answer"))
-    except Exception:
-        return True
-
-def _first_non_empty(*vals):
-    for v in vals:
-        if v:
-            return v
-    return None
-
-# ---------------------- Search providers ----------------------
-@st.cache_data(show_spinner=False, ttl=3600)
-def search_bing_api(query: str, key: str, count: int = 20) -> List[str]:
-    if not key:
-        return []
-    try:
-        endpoint = "https://api.bing.microsoft.com/v7.0/search"
-        headers = {"Ocp-Apim-Subscription-Key": key}
-        params = {"q": query, "mkt": "en-US", "count": count}
-        r = HTTP.get(endpoint, headers=headers, params=params, timeout=20)
-        r.raise_for_status()
-        data = r.json()
-        urls = [v["url"] for v in (data.get("webPages") or {}).get("value", []) if v.get("url")]
-        return [u for u in urls if looks_like_business_site(u)][:count]
-    except Exception:
-        return []
-
-@st.cache_data(show_spinner=False, ttl=3600)
-def search_serp_api(
-    query: str,
-    base_url: str,
-    key: str,
-    method: str = "GET",
-    auth_header: Optional[str] = "X-API-KEY",
-    key_param: Optional[str] = None,
-    count: int = 20,
-) -> List[str]:
-    if not base_url or not key:
-        return []
-    try:
-        headers = {"User-Agent": HTTP.headers.get("User-Agent")}
-        if auth_header:
-            headers[auth_header] = key
-        params = {"q": query, "count": count}
-        if key_param:
-            params[key_param] = key
-
-        if method.upper() == "POST":
-            r = HTTP.post(base_url, headers=headers, json=params, timeout=25)
-        else:
-            r = HTTP.get(base_url, headers=headers, params=params, timeout=25)
-
-        r.raise_for_status()
-        data = r.json()
-        urls: List[str] = []
-
-        if isinstance(data, dict):
-            if "webPages" in data and isinstance(data["webPages"], dict) and "value" in data["webPages"]:
-                urls = [v.get("url") for v in data["webPages"]["value"] if v.get("url")]
-            elif "results" in data and isinstance(data["results"], list):
-                for item in data["results"]:
-                    u = (item.get("url") or item.get("link"))
-                    if u:
-                        urls.append(u)
-        elif isinstance(data, list):
-            for item in data:
-                if isinstance(item, str):
-                    urls.append(item)
-                elif isinstance(item, dict):
-                    u = (item.get("url") or item.get("link"))
-                    if u:
-                        urls.append(u)
-
-        return [u for u in urls if u and looks_like_business_site(u)][:count]
-    except Exception:
-        return []
-
-# ---------------------- Unlocker fetch ----------------------
-@st.cache_data(show_spinner=False, ttl=3600)
-def unlocker_fetch(
-    url: str,
-    unlocker_base: str,
-    key: str,
-    key_header: Optional[str] = "X-API-KEY",
-    key_param: Optional[str] = None,
-) -> Optional[str]:
-    try:
-        headers = {"User-Agent": HTTP.headers.get("User-Agent")}
-        if key_header:
-            headers[key_header] = key
-        params = {"url": url}
-        if key_param:
-            params[key_param] = key
-        r = HTTP.get(unlocker_base, headers=headers, params=params, timeout=30)
-        r.raise_for_status()
-        if r.headers.get("Content-Type", "").startswith("application/json"):
-            j = r.json()
-            return j.get("html")
-        return r.text
-    except Exception:
-        return None
-
-# ---------------------- Extraction ----------------------
-def extract_company_info_from_html(html: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
-    if not html:
-        return None, None, None
-
-    soup = BeautifulSoup(html, "html.parser")
-
-    # Email: prefer explicit mailto: links, then page text
-    mailto = [
-        a.get("href", "").replace("mailto:", "").strip()
-        for a in soup.select('a[href^="mailto:"]')
-        if a.get("href")
-    ]
-    mailto = [e.split("?")[0] for e in mailto if EMAIL_RE.match(e)]
-
-    # Phone: microdata or visible text
-    phone_nodes = soup.select('[itemprop="telephone"], a[href^="tel:"], .phone, .tel')
-    phone_candidates = [n.get_text(" ", strip=True) for n in phone_nodes] if phone_nodes else []
-    text = soup.get_text(" ", strip=True)
-    phones = phone_candidates + PHONE_RE.findall(text)
-
-    # Company: title | h1 | schema.org Organization name
-    title = (soup.title.string if soup.title and soup.title.string else "").strip()
-    title_main = title.split(" | ")[0].split(" – ")[0].split(" - ")[0].strip()[:120] if title else None
-    h1 = soup.find("h1")
-    h1_txt = h1.get_text(strip=True)[:120] if h1 and h1.get_text(strip=True) else None
-    org = soup.select_one('[itemtype*="schema.org/Organization"] [itemprop="name"]')
-    org_txt = org.get_text(strip=True)[:120] if org else None
-
-    company = _first_non_empty(title_main, h1_txt, org_txt)
-
-    # Final picks
-    email = _first_non_empty(*(mailto or []))
-    if not email:
-        emails_in_text = EMAIL_RE.findall(text)
-        email = _first_non_empty(*(emails_in_text or []))
-
-    phone = _first_non_empty(*(phones or []))
-
-    return company, email, phone
-
-def extract_company_info(
-    url: str,
-    unlocker_base: str = "",
-    unlocker_key: str = "",
-    key_header: Optional[str] = "X-API-KEY",
-    key_param: Optional[str] = None,
-):
-    html = None
-    if unlocker_base and unlocker_key:
-        html = unlocker_fetch(url, unlocker_base, unlocker_key, key_header=key_header, key_param=key_param)
-    if not html:
-        try:
-            r = HTTP.get(url, timeout=15)
-            r.raise_for_status()
-            html = r.text
-        except Exception:
-            return None, None, None
-    return extract_company_info_from_html(html)
+# Session-state lead index: lowercased email -> row dict. O(1) dedup/insert;
+# a DataFrame is only materialized for display and export.
+BASE_COLS = ["Company", "Email", "Website", "Phone", "Source"]
+if "leads_by_email" not in st.session_state:
+    st.session_state.leads_by_email = {}
+
+def leads_df(categorical_source: bool = False) -> pd.DataFrame:
+    """Materialize the lead dict as a DataFrame.
+
+    categorical_source packs the handful of distinct Source values into
+    category codes — use it for read-only views only; the grid editor
+    needs plain strings so users can type new sources.
+    """
+    df = pd.DataFrame(list(st.session_state.leads_by_email.values()), columns=BASE_COLS)
+    if categorical_source and not df.empty:
+        df["Source"] = df["Source"].astype("category")
+    return df
 
 # ---------------------- Lead insert + filters ----------------------
 st.session_state.setdefault("skip_generic", True)
 st.session_state.setdefault("verify_mx", True)
 
+def _lead_row(name, email, website, phone, source):
+    return {
+        "Company": (name or "").strip()[:120],
+        "Email": email.strip(),
+        "Website": website,
+        "Phone": (phone or "").strip(),
+        "Source": source,
+    }
+
 def upsert_lead(name, email, website, phone, source):
     if not email:
         return
@@ -282,37 +81,76 @@ def upsert_lead(name, email, website, phone, source):
     if st.session_state.get("verify_mx") and not verify_email_mx(email):
         return
 
-    df = st.session_state.leads
-    lowers = set(df["Email"].dropna().str.lower())
-    if email.lower() in lowers:
+    key = email.strip().lower()
+    leads = st.session_state.leads_by_email
+    if key in leads:
         return
-
-    st.session_state.leads.loc[len(df)] = {
-        "Company": (name or "").strip()[:120],
-        "Email": email.strip(),
-        "Website": website,
-        "Phone": (phone or "").strip(),
-        "Source": source,
-    }
+    leads[key] = _lead_row(name, email, website, phone, source)
+
+def upsert_leads_bulk(rows, source) -> int:
+    """Same filters/dedup as upsert_lead for an iterable of
+    (name, email, website, phone) tuples; returns the number added."""
+    leads = st.session_state.leads_by_email
+    skip_generic = st.session_state.get("skip_generic")
+    verify_mx = st.session_state.get("verify_mx")
+
+    added = 0
+    for name, email, website, phone in rows:
+        if not email:
+            continue
+        if skip_generic and is_generic_email(email):
+            continue
+        if verify_mx and not verify_email_mx(email):
+            continue
+        key = email.strip().lower()
+        if key in leads:
+            continue
+        leads[key] = _lead_row(name, email, website, phone, source)
+        added += 1
+    return added
 
 # ---------------------- Gmail sending ----------------------
-def send_email_gmail(to_email: str, subject: str, html: str) -> int:
-    if not GMAIL_USER or not GMAIL_APP_PASSWORD:
-        raise RuntimeError("Set GMAIL_USER and GMAIL_APP_PASSWORD in Streamlit Secrets.")
-    msg = MIMEMultipart("alternative")
-    msg["From"] = f"{SENDER_NAME} <{GMAIL_USER}>"
-    msg["To"] = to_email
-    msg["Subject"] = subject
-    msg["Reply-To"] = REPLY_TO
-    part = MIMEText(html, "html")
-    msg.attach(part)
-    context = ssl.create_default_context()
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-        server.login(GMAIL_USER, GMAIL_APP_PASSWORD)
-        failures = server.sendmail(GMAIL_USER, [to_email], msg.as_string())
+class GmailSender:
+    """One SMTP_SSL connection reused for a whole batch of sends.
+
+    The TLS + LOGIN handshake costs a few hundred ms; doing it once per
+    campaign instead of once per message is the difference between seconds
+    and a minute at a 100-email cap.
+    """
+
+    def __init__(self):
+        if not GMAIL_USER or not GMAIL_APP_PASSWORD:
+            raise RuntimeError("Set GMAIL_USER and GMAIL_APP_PASSWORD in Streamlit Secrets.")
+        self.server = None
+
+    def __enter__(self):
+        context = ssl.create_default_context()
+        self.server = smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context)
+        self.server.login(GMAIL_USER, GMAIL_APP_PASSWORD)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self.server.quit()
+        except Exception:
+            pass
+        return False
+
+    def send(self, to_email: str, subject: str, html: str) -> int:
+        msg = MIMEMultipart("alternative")
+        msg["From"] = f"{SENDER_NAME} <{GMAIL_USER}>"
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        msg["Reply-To"] = REPLY_TO
+        msg.attach(MIMEText(html, "html"))
+        failures = self.server.sendmail(GMAIL_USER, [to_email], msg.as_string())
         if failures:
             raise RuntimeError(f"Failed for: {failures}")
-    return 250
+        return 250
+
+def send_email_gmail(to_email: str, subject: str, html: str) -> int:
+    with GmailSender() as sender:
+        return sender.send(to_email, subject, html)
 
 # ---------------------- Sidebar ----------------------
 with st.sidebar:
@@ -355,6 +193,15 @@ with st.sidebar:
         "Verify email domains via MX lookup", value=st.session_state.get("verify_mx", True)
     )
 
+    st.markdown("---")
+    if st.button("Force refresh (clear HTTP + search caches)"):
+        try:
+            HTTP.cache.clear()  # on-disk requests-cache, if active
+        except AttributeError:
+            pass
+        st.cache_data.clear()
+        st.success("Caches cleared — next run hits the network.")
+
 # ---------------------- Tabs ----------------------
 tab_search, tab_results, tab_email, tab_export = st.tabs(["Search", "Results", "Email", "Export/Import"])
 
@@ -391,67 +238,90 @@ with tab_search:
 
     if st.button("Search & Extract"):
         try:
-            queries: List[str] = []
-            if "General Contractors" in categories:
-                queries.append(f'General Contractors "{location}" {radius_phrase} (site:.com OR site:.net OR site:.org)')
-            if "Builders" in categories:
-                queries.append(f'Home Builders "{location}" {radius_phrase} (site:.com OR site:.net OR site:.org)')
-            if "Architects" in categories:
-                queries.append(f'Architecture Firms "{location}" {radius_phrase} (site:.com OR site:.net OR site:.org)')
+            if provider.startswith("Bing API"):
+                # one OR-grouped call covers every category: 1 RTT, 1 quota unit
+                q = batched_query(categories, location, radius_phrase)
+                queries: List[str] = [q] if q else []
+            else:
+                queries = list(iter_queries(categories, location, radius_phrase))
 
             per_q = max(10, max_sites // max(len(queries), 1))
             all_urls: List[str] = []
             progress = st.progress(0)
 
-            for i, q in enumerate(queries):
+            def run_query(q: str) -> List[str]:
+                # polite jitter per worker instead of a serial sleep between queries
+                if rate_delay:
+                    time.sleep(random.uniform(0, rate_delay))
                 if provider.startswith("Bing API"):
                     key = st.secrets.get("BING_API_KEY", "") or BING_API_KEY
-                    urls = search_bing_api(q, key=key, count=per_q)
-                else:
-                    urls = search_serp_api(
-                        q,
-                        base_url=SERP_BASE_URL,
-                        key=SERP_KEY,
-                        method=SERP_METHOD,
-                        auth_header=(SERP_AUTH_HEADER or None),
-                        key_param=(SERP_KEY_PARAM or None),
-                        count=per_q,
-                    )
-
-                all_urls += urls
-                progress.progress(int(((i + 1) / max(len(queries), 1)) * 100))
-                if rate_delay:
-                    time.sleep(rate_delay)
-
-            # Deduplicate by domain and drop excluded
+                    return search_bing_api(q, key=key, count=per_q)
+                return search_serp_api(
+                    q,
+                    base_url=SERP_BASE_URL,
+                    key=SERP_KEY,
+                    method=SERP_METHOD,
+                    auth_header=(SERP_AUTH_HEADER or None),
+                    key_param=(SERP_KEY_PARAM or None),
+                    count=per_q,
+                )
+
+            with ThreadPoolExecutor(max_workers=min(8, max(len(queries), 1))) as ex:
+                q_futures = [ex.submit(run_query, q) for q in queries]
+                for i, fut in enumerate(as_completed(q_futures), start=1):
+                    try:
+                        all_urls += fut.result()
+                    except Exception:
+                        pass
+                    progress.progress(int((i / max(len(queries), 1)) * 100))
+
+            # Deduplicate by domain, drop excluded, and skip domains already
+            # crawled earlier in this session (repeat searches overlap heavily)
+            crawled = st.session_state.setdefault("crawled_domains", set())
             by_domain = {}
             for u in all_urls:
+                u = canonical_url(u)
                 d = domain_of(u) or u
-                if d not in by_domain and not any(d.endswith(x) or d == x for x in EXCLUDE_DOMAINS):
-                    by_domain[d] = u
+                if d not in crawled and not is_excluded_domain(d):
+                    by_domain.setdefault(d, u)
 
             urls = list(by_domain.values())[:max_sites]
+            crawled.update(domain_of(u) or u for u in urls)
             st.write(f"Unique candidate sites: **{len(urls)}**")
 
-            added = 0
-            for j, base in enumerate(urls, start=1):
-                for path in ["", "/contact", "/contact-us", "/contactus", "/about", "/team", "/contacts"]:
-                    target = base.rstrip("/") + path
-                    name, email, phone = extract_company_info(
-                        target,
-                        unlocker_base=UNLOCKER_BASE if UNLOCKER_BASE and UNLOCKER_KEY else "",
-                        unlocker_key=UNLOCKER_KEY,
-                        key_header=(UNLOCKER_AUTH_HEADER or None),
-                        key_param=(UNLOCKER_KEY_PARAM or None),
-                    )
-                    if email:
-                        upsert_lead(name, email, base, phone, source=("serp+unlocker" if UNLOCKER_BASE and UNLOCKER_KEY else "serp"))
-                        added += 1
-                        break
-                    if rate_delay:
-                        time.sleep(rate_delay)
-                progress.progress(int((j / max(len(urls), 1)) * 100))
-
+            hits = []
+            source = "serp+unlocker" if UNLOCKER_BASE and UNLOCKER_KEY else "serp"
+            with st.status(f"Probing {len(urls)} sites…", expanded=True) as status:
+                live = st.empty()
+                with ThreadPoolExecutor(max_workers=16) as ex:
+                    futures = {
+                        ex.submit(
+                            probe_site,
+                            base,
+                            unlocker_base=UNLOCKER_BASE if UNLOCKER_BASE and UNLOCKER_KEY else "",
+                            unlocker_key=UNLOCKER_KEY,
+                            key_header=(UNLOCKER_AUTH_HEADER or None),
+                            key_param=(UNLOCKER_KEY_PARAM or None),
+                            rate_delay=rate_delay,
+                        ): base
+                        for base in urls
+                    }
+                    for j, fut in enumerate(as_completed(futures), start=1):
+                        base = futures[fut]
+                        try:
+                            name, email, phone = fut.result()
+                        except Exception:
+                            name = email = phone = None
+                        if email:
+                            hits.append((name, email, base, phone))
+                            live.write(f"**{len(hits)}** contacts so far — latest: {email}")
+                        progress.progress(int((j / max(len(urls), 1)) * 100))
+                status.update(
+                    label=f"Probed {len(urls)} sites — {len(hits)} contacts found",
+                    state="complete",
+                )
+
+            added = upsert_leads_bulk(hits, source=source)
             st.success(f"Added {added} contacts. Check **Results** tab.")
         except Exception as e:
             st.exception(e)
@@ -487,8 +357,7 @@ with tab_results:
         elif st.session_state.get("verify_mx") and not verify_email_mx(email):
             st.warning("Skipped: email domain appears to have no MX record. Uncheck the MX filter in the sidebar to allow.")
         else:
-            lowers = set(st.session_state.leads["Email"].dropna().str.lower())
-            if email.lower() in lowers:
+            if email.lower() in st.session_state.leads_by_email:
                 st.info("Duplicate email — this lead already exists.")
             else:
                 upsert_lead(company, email, website, phone, source_in or "manual")
@@ -514,48 +383,74 @@ with tab_results:
         if not raw:
             st.error("Nothing to import.")
         else:
-            rows = [r for r in raw.splitlines() if r.strip()]
-            if do_header and rows:
-                rows = rows[1:]  # drop header row
-
             added = 0
             skipped_invalid = 0
             skipped_generic = 0
             skipped_mx = 0
             skipped_dup = 0
 
-            existing = set(st.session_state.leads["Email"].dropna().str.lower())
-            delim = "\t" if delimiter == "\t" else delimiter
-
-            header_map = {}
-            if do_header and bulk_text:
-                hdr_line = bulk_text.splitlines()[0]
-                hdr_cols = [h.strip().lower() for h in hdr_line.split(delim)]
-                for idx, name in enumerate(hdr_cols):
-                    header_map[name] = idx
-
-            def get_col(cols, name, default_idx):
-                if header_map and name in header_map and header_map[name] < len(cols):
-                    return cols[header_map[name]].strip()
-                if default_idx < len(cols):
-                    return cols[default_idx].strip()
-                return ""
-
-            for line in rows:
-                cols = [c.strip() for c in line.split(delim)]
-                company = get_col(cols, "company", 0)[:120]
-                email = get_col(cols, "email", 1)
-                website = get_col(cols, "website", 2)
-                phone = get_col(cols, "phone", 3)
-                source = get_col(cols, "source", 4) or "manual"
-
-                if not email or not EMAIL_RE.match(email):
+            existing = st.session_state.leads_by_email
+
+            # pandas handles the header row, column order, and quoting that
+            # the old hand-rolled splitter tripped over
+            try:
+                new = pd.read_csv(
+                    io.StringIO(raw),
+                    sep=delimiter,
+                    header=0 if do_header else None,
+                    dtype=str,
+                    keep_default_na=False,
+                    engine="python",
+                )
+            except Exception as exc:
+                st.error(f"Could not parse rows: {exc}")
+                st.stop()
+
+            # short rows pad with NaN even under keep_default_na; degrade
+            # them to empty strings like the old splitter did
+            new = new.fillna("")
+
+            if do_header:
+                new.columns = [str(c).strip().title() for c in new.columns]
+            else:
+                # ignore trailing columns beyond the five we know about
+                new = new.iloc[:, : len(BASE_COLS)]
+                new.columns = BASE_COLS[: len(new.columns)]
+
+            def col(name: str) -> pd.Series:
+                if name in new.columns:
+                    return new[name].astype(str).str.strip()
+                return pd.Series([""] * len(new))
+
+            skip_generic = st.session_state.get("skip_generic")
+            verify_mx = st.session_state.get("verify_mx")
+
+            parsed = [
+                (c[:120], e, w, p, s or "manual", parse_email(e) if e else None)
+                for c, e, w, p, s in zip(col("Company"), col("Email"), col("Website"),
+                                         col("Phone"), col("Source"))
+            ]
+
+            # Warm the per-domain MX cache concurrently so the filter loop
+            # below never waits on a DoH round trip
+            if verify_mx:
+                domains = {p[1].lower() for _, e, _, _, _, p in parsed
+                           if p and EMAIL_RE.fullmatch(e)}
+                if domains:
+                    with ThreadPoolExecutor(max_workers=8) as ex:
+                        list(ex.map(verify_domain_mx, domains))
+
+            for company, email, website, phone, source, parts in parsed:
+                # Parse once: fullmatch rejects trailing junk, and the split
+                # (local, domain) feeds both quality filters
+                if not parts or not EMAIL_RE.fullmatch(email):
                     skipped_invalid += 1
                     continue
-                if st.session_state.get("skip_generic") and is_generic_email(email):
+                local, dom = parts
+                if skip_generic and is_generic_local(local):
                     skipped_generic += 1
                     continue
-                if st.session_state.get("verify_mx") and not verify_email_mx(email):
+                if verify_mx and not verify_domain_mx(dom.lower()):
                     skipped_mx += 1
                     continue
                 if email.lower() in existing:
@@ -563,7 +458,6 @@ with tab_results:
                     continue
 
                 upsert_lead(company, email, website, phone, source)
-                existing.add(email.lower())
                 added += 1
 
             st.success(f"Imported {added} lead(s).")
@@ -582,15 +476,8 @@ with tab_results:
     st.markdown("### Edit / Append in grid")
     st.caption("Add new rows at the bottom. Click **Save grid changes** to validate & apply filters/dedup.")
 
-    # Ensure consistent column order & types
-    base_cols = ["Company", "Email", "Website", "Phone", "Source"]
-    df_now = st.session_state.leads.copy()
-    for c in base_cols:
-        if c not in df_now.columns:
-            df_now[c] = ""
-
     edited = st.data_editor(
-        df_now[base_cols],
+        leads_df(),
         num_rows="dynamic",
         use_container_width=True,
         key="leads_editor",
@@ -605,15 +492,16 @@ with tab_results:
         skipped_mx = 0
         deduped = 0
 
-        cleaned_rows = []
-        seen = set()
+        cleaned = {}
 
         for _, row in edited.iterrows():
             company = (str(row.get("Company", "") or "")).strip()[:120]
             email = (str(row.get("Email", "") or "")).strip()
             website = (str(row.get("Website", "") or "")).strip()
             phone = (str(row.get("Phone", "") or "")).strip()
-            source = (str(row.get("Source", "") or "manual")).strip() or "manual"
+            source = row.get("Source", "manual")
+            # rows appended in the editor come back with Source as NaN
+            source = "manual" if pd.isna(source) or not str(source).strip() else str(source).strip()
 
             if not email or not EMAIL_RE.match(email):
                 skipped_invalid += 1
@@ -624,18 +512,17 @@ with tab_results:
             if st.session_state.get("verify_mx") and not verify_email_mx(email):
                 skipped_mx += 1
                 continue
-            if email.lower() in seen:
+            if email.lower() in cleaned:
                 deduped += 1
                 continue
 
-            cleaned_rows.append(
-                {"Company": company, "Email": email, "Website": website, "Phone": phone, "Source": source}
-            )
-            seen.add(email.lower())
+            cleaned[email.lower()] = {
+                "Company": company, "Email": email, "Website": website, "Phone": phone, "Source": source
+            }
 
-        prev_count = len(st.session_state.leads)
-        st.session_state.leads = pd.DataFrame(cleaned_rows, columns=base_cols)
-        kept = len(st.session_state.leads)
+        prev_count = len(st.session_state.leads_by_email)
+        st.session_state.leads_by_email = cleaned
+        kept = len(cleaned)
         added = max(0, kept - min(prev_count, kept))
 
         st.success(f"Saved grid. Total kept: {kept}.")
@@ -651,7 +538,7 @@ with tab_results:
     st.markdown("---")
 
     # ---------- Current table ----------
-    df = st.session_state.leads.copy()
+    df = leads_df(categorical_source=True)
     if df.empty:
         st.info("No leads yet. Add manually above or run a search in the **Search** tab.")
     else:
@@ -663,13 +550,14 @@ with tab_results:
             emails_to_remove = st.text_input("Emails to remove (comma-separated)", key="remove_box")
             if st.button("Remove selected"):
                 emails_rm = {e.strip().lower() for e in emails_to_remove.split(",") if e.strip()}
-                before = len(st.session_state.leads)
-                st.session_state.leads = st.session_state.leads[~st.session_state.leads["Email"].str.lower().isin(emails_rm)]
-                after = len(st.session_state.leads)
-                st.success(f"Removed {before - after} lead(s).")
+                removed = 0
+                for e in emails_rm:
+                    if st.session_state.leads_by_email.pop(e, None) is not None:
+                        removed += 1
+                st.success(f"Removed {removed} lead(s).")
         with c2:
             if st.button("Clear ALL leads"):
-                st.session_state.leads = st.session_state.leads.iloc[0:0]
+                st.session_state.leads_by_email.clear()
                 st.warning("All leads cleared.")
 
 # ====================== EMAIL TAB ======================
@@ -706,7 +594,7 @@ with tab_email:
         )
         daily_cap = st.number_input("Daily send cap", min_value=10, max_value=500, value=100, step=10)
 
-    emails = st.session_state.leads["Email"].dropna().tolist() if not st.session_state.leads.empty else []
+    emails = [row["Email"] for row in st.session_state.leads_by_email.values() if row.get("Email")]
     preview = st.selectbox("Preview recipient", options=(emails[:50] or ["no-data"]))
 
     def render_html(greeting, body, signature):
@@ -739,32 +627,57 @@ with tab_email:
         if not GMAIL_APP_PASSWORD:
             st.error("GMAIL_APP_PASSWORD not set in Secrets.")
         else:
-            sent = 0
+            html_body = render_html(greeting, body, signature)
+
+            recipients = []
             for e in emails:
-                if sent >= daily_cap:
+                if len(recipients) >= daily_cap:
                     break
                 if st.session_state.get("skip_generic") and is_generic_email(e):
                     continue
                 if st.session_state.get("verify_mx") and not verify_email_mx(e):
                     continue
+                recipients.append(e)
+
+            def send_group(group: List[str]) -> int:
+                n = 0
                 try:
-                    send_email_gmail(e, subject, render_html(greeting, body, signature))
-                    sent += 1
-                    time.sleep(0.3)
+                    with GmailSender() as sender:
+                        for e in group:
+                            try:
+                                sender.send(e, subject, html_body)
+                                n += 1
+                                time.sleep(0.3)
+                            except Exception:
+                                continue
                 except Exception:
-                    continue
+                    pass
+                return n
+
+            sent = 0
+            if recipients:
+                # a few persistent connections in parallel; Gmail tolerates
+                # small connection counts far better than rapid reconnects
+                workers = min(4, len(recipients))
+                groups = [recipients[i::workers] for i in range(workers)]
+                with ThreadPoolExecutor(max_workers=workers) as ex:
+                    sent = sum(ex.map(send_group, groups))
             st.success(f"Sent {sent} emails via Gmail.")
 
 # ====================== EXPORT / IMPORT TAB ======================
 with tab_export:
     st.subheader("Export / Import")
-    df = st.session_state.leads.copy()
+    df = leads_df()
     colX, colY = st.columns(2)
     with colX:
         if not df.empty:
+            # write in chunks into one buffer instead of building the whole
+            # CSV as an intermediate string
+            csv_buf = io.BytesIO()
+            df.to_csv(csv_buf, index=False, chunksize=10_000)
             st.download_button(
                 "Download leads.csv",
-                data=df.to_csv(index=False),
+                data=csv_buf.getvalue(),
                 file_name="leads.csv",
                 mime="text/csv",
             )
@@ -772,30 +685,26 @@ with tab_export:
         up = st.file_uploader("Import leads.csv", type=["csv"])
         if up is not None:
             try:
-                new = pd.read_csv(up)
-                rename = {c: c.strip().title() for c in new.columns}
-                new.rename(columns=rename, inplace=True)
-                existing = set(st.session_state.leads["Email"].dropna().str.lower())
-                imported = 0
-                for _, row in new.iterrows():
-                    email = str(row.get("Email", "") or "").strip()
-                    if not email or not EMAIL_RE.match(email):
-                        continue
-                    if st.session_state.get("skip_generic") and is_generic_email(email):
-                        continue
-                    if st.session_state.get("verify_mx") and not verify_email_mx(email):
-                        continue
-                    if email.lower() in existing:
-                        continue
-                    st.session_state.leads.loc[len(st.session_state.leads)] = {
-                        "Company": str(row.get("Company", "") or "")[:120],
-                        "Email": email,
-                        "Website": str(row.get("Website", "") or ""),
-                        "Phone": str(row.get("Phone", "") or ""),
-                        "Source": "import",
-                    }
-                    existing.add(email.lower())
-                    imported += 1
+                new = pd.read_csv(up, dtype=str, keep_default_na=False)
+                # ragged rows pad with NaN regardless of keep_default_na;
+                # blank them so masks stay boolean and .strip() stays safe
+                new = new.fillna("")
+                new.rename(columns={c: c.strip().title() for c in new.columns}, inplace=True)
+
+                def col(name: str) -> pd.Series:
+                    if name in new.columns:
+                        return new[name].str.strip()
+                    return pd.Series([""] * len(new))
+
+                # validate the whole Email column in one C-level regex pass,
+                # then zip only the surviving rows
+                emails_s = col("Email")
+                # no re.ASCII here: pandas' arrow string path rejects it, and
+                # the pattern's character classes are ASCII-only anyway
+                valid = (emails_s != "") & emails_s.str.match(EMAIL_RE.pattern)
+                rows = list(zip(col("Company")[valid], emails_s[valid],
+                                col("Website")[valid], col("Phone")[valid]))
+                imported = upsert_leads_bulk(rows, "import")
                 st.success(f"Imported {imported} leads.")
             except Exception as e:
                 st.error(f"Import failed: {e}")
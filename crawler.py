@@ -0,0 +1,537 @@
+# crawler.py — shared HTTP session, regexes, and extraction logic for the app
+import re
+import time
+from functools import lru_cache
+from itertools import cycle
+from html import unescape
+from urllib.parse import urlparse
+from typing import Optional, Tuple, List
+
+import requests
+import streamlit as st
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Prefer the C-based lxml parser; fall back for deployments without it
+try:
+    import lxml  # noqa: F401
+    BS_PARSER = "lxml"
+except ImportError:
+    BS_PARSER = "html.parser"
+
+# selectolax (Lexbor C engine) is faster still for the few selectors we need;
+# extraction falls back to BeautifulSoup when it isn't installed
+try:
+    from selectolax.parser import HTMLParser as _SelectolaxParser
+except ImportError:
+    _SelectolaxParser = None
+
+# ---------------------- Regexes / constants ----------------------
+# re.ASCII keeps \b/\d/\s on the fast byte tables instead of Unicode lookups
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b", re.ASCII)
+# Digit-boundary lookarounds keep the match from starting or ending inside a
+# longer digit run (asset hashes, tracking IDs), which also curbs backtracking;
+# the area-code group requires balanced parens or none, so the engine never
+# retries half-open "(123 " variants
+PHONE_RE = re.compile(r"(?<!\d)(?:\+?1[\s\-.]?)?(?:\(\d{3}\)|\d{3})[\s\-.]?\d{3}[\s\-.]?\d{4}(?!\d)", re.ASCII)
+# Single alternation so one pass over the page text yields both kinds of match
+CONTACT_RE = re.compile(rf"(?P<email>{EMAIL_RE.pattern})|(?P<phone>{PHONE_RE.pattern})", re.ASCII)
+TITLE_SEP_RE = re.compile(r" \| | – | - ")
+TITLE_RE = re.compile(r"<title[^>]*>([^<]{1,300})</title>", re.I)
+
+def _title_from_html(html: str) -> Optional[str]:
+    """Pull <title> with one regex — no parse tree needed."""
+    m = TITLE_RE.search(html)
+    return unescape(m.group(1)).strip() if m else None
+
+SOCIAL_AGG_DOMAINS = (
+    "facebook.com", "instagram.com", "linkedin.com", "twitter.com", "x.com",
+    "youtube.com", "yelp.com", "angieslist.com", "houzz.com", "pinterest.com",
+    "tiktok.com", "homeadvisor.com", "thumbtack.com", "porch.com", "bbb.org"
+)
+EXCLUDE_DOMAINS = (
+    "google.com", "maps.google.com", "duckduckgo.com", "bing.com",
+    "support.google.com", "developers.google.com", "webcache.googleusercontent.com",
+)
+GENERIC_PREFIXES = {"info", "contact", "sales", "hello", "admin", "support", "office", "team"}
+# One compiled alternation replaces a per-domain substring scan
+SOCIAL_AGG_RE = re.compile("|".join(map(re.escape, SOCIAL_AGG_DOMAINS)))
+EXCLUDE_SET = frozenset(EXCLUDE_DOMAINS)
+EXCLUDE_SUFFIXES = tuple("." + x for x in EXCLUDE_DOMAINS)
+
+def is_excluded_domain(d: str) -> bool:
+    return d in EXCLUDE_SET or d.endswith(EXCLUDE_SUFFIXES)
+
+# Regex "emails" that are really asset filenames (logo@2x.png) or placeholders
+NOISE_EMAIL_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp")
+NOISE_EMAIL_DOMAINS = frozenset({"example.com", "domain.com", "yourdomain.com", "sentry.io"})
+
+def is_noise_email(email: str) -> bool:
+    e = email.lower()
+    return e.endswith(NOISE_EMAIL_SUFFIXES) or e.rsplit("@", 1)[-1] in NOISE_EMAIL_DOMAINS
+
+# Search term used for each UI category
+CATEGORY_TERMS = {
+    "General Contractors": "General Contractors",
+    "Builders": "Home Builders",
+    "Architects": "Architecture Firms",
+}
+
+def iter_queries(categories, location: str, radius_phrase: str):
+    """Yield one search query per selected category, formatted on demand."""
+    for cat in categories:
+        term = CATEGORY_TERMS.get(cat)
+        if term:
+            yield f'{term} "{location}" {radius_phrase} (site:.com OR site:.net OR site:.org)'
+
+def batched_query(categories, location: str, radius_phrase: str) -> str:
+    """One OR-grouped query covering every selected category.
+
+    Bing handles the grouped form fine, so three per-category round trips
+    (and three quota units) collapse into one call.
+    """
+    terms = [CATEGORY_TERMS[c] for c in categories if c in CATEGORY_TERMS]
+    if not terms:
+        return ""
+    group = " OR ".join(f'"{t}"' for t in terms)
+    return f'({group}) "{location}" {radius_phrase} (site:.com OR site:.net OR site:.org)'
+
+# ---------------------- Robust HTTP session ----------------------
+UA_POOL = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/123 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_5) AppleWebKit/605.1.15 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/123 Safari/537.36",
+)
+
+class _RotatingUAAdapter(HTTPAdapter):
+    """Cycles the User-Agent across outgoing requests.
+
+    Rotation happens at send time on the already-built request, so no
+    per-call headers dict is rebuilt anywhere upstream.
+    """
+
+    _ua = cycle(UA_POOL)
+
+    def send(self, request, **kwargs):
+        request.headers["User-Agent"] = next(self._ua)
+        return super().send(request, **kwargs)
+
+@st.cache_resource(show_spinner=False)
+def _session_with_retries():
+    try:
+        # Persistent on-disk cache: repeat searches / re-crawls of the same
+        # pages skip the network entirely for a day
+        from requests_cache import CachedSession
+        s = CachedSession(
+            "mmf_http_cache",
+            backend="sqlite",
+            expire_after=86400,
+            allowable_methods=("GET",),
+            stale_if_error=True,
+        )
+    except ImportError:
+        s = requests.Session()
+    r = Retry(
+        total=6, connect=3, read=3, status=3,
+        backoff_factor=0.7,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "POST"]),
+        raise_on_status=False,
+    )
+    adapter = _RotatingUAAdapter(pool_connections=64, pool_maxsize=64, max_retries=r, pool_block=False)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers.update({
+        "User-Agent": UA_POOL[0],  # default; the adapter rotates per request
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Connection": "keep-alive",
+    })
+    return s
+
+HTTP = _session_with_retries()
+
+# ---------------------- Helpers ----------------------
+_TRACKING_PARAM_PREFIXES = ("utm_", "fbclid", "gclid", "msclkid", "mc_")
+
+@lru_cache(maxsize=4096)
+def canonical_url(u: str) -> str:
+    """Normalize a SERP URL so trivial variants dedupe to one fetch.
+
+    Lowercases scheme/host, drops the fragment and tracking params, and
+    strips a trailing slash from the path.
+    """
+    try:
+        p = urlparse(u)
+        query = "&".join(
+            part for part in p.query.split("&")
+            if part and not part.split("=", 1)[0].lower().startswith(_TRACKING_PARAM_PREFIXES)
+        )
+        path = p.path.rstrip("/")
+        out = f"{p.scheme.lower()}://{p.netloc.lower()}{path}"
+        return f"{out}?{query}" if query else out
+    except Exception:
+        return u
+
+@lru_cache(maxsize=4096)
+def domain_of(u: str) -> str:
+    try:
+        d = urlparse(u).netloc.lower()
+        return d[4:] if d.startswith("www.") else d
+    except Exception:
+        return ""
+
+def parse_email(email: str) -> Optional[Tuple[str, str]]:
+    """Split an address into (local, domain) once; None if it has no @."""
+    if "@" not in email:
+        return None
+    local, domain = email.split("@", 1)
+    return local, domain
+
+def is_generic_local(local: str) -> bool:
+    return local.lower() in GENERIC_PREFIXES
+
+def is_generic_email(email: str) -> bool:
+    parts = parse_email(email)
+    return is_generic_local(parts[0]) if parts else False
+
+BUSINESS_TLDS = (".com", ".net", ".org", ".io", ".co", ".us")
+
+@lru_cache(maxsize=4096)
+def looks_like_business_site(u: str) -> bool:
+    d = domain_of(u)
+    if not d:
+        return False
+    if SOCIAL_AGG_RE.search(d) or is_excluded_domain(d):
+        return False
+    # single C-level endswith over the tuple; this runs for every SERP result
+    return d.endswith(BUSINESS_TLDS)
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def verify_domain_mx(domain: str) -> bool:
+    """DNS-over-HTTPS MX check via Google DNS; permissive on failure."""
+    try:
+        r = HTTP.get(f"https://dns.google/resolve?name={domain}&type=MX", timeout=5)
+        if not r.ok:
+            return True  # don't over-block on transient errors
+        j = r.json()
+        return bool(j.get("Answer"))
+    except Exception:
+        return True
+
+def verify_email_mx(email: str) -> bool:
+    """MX check cached per domain — every local part of a domain shares one lookup."""
+    parts = parse_email(email)
+    return verify_domain_mx(parts[1].lower()) if parts else True
+
+def _first_non_empty(*vals):
+    for v in vals:
+        if v:
+            return v
+    return None
+
+# ---------------------- Search providers ----------------------
+_BING_MAX_COUNT = 50  # Bing Web Search v7 rejects count > 50
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def search_bing_api(query: str, key: str, count: int = 20) -> List[str]:
+    if not key:
+        return []
+    try:
+        endpoint = "https://api.bing.microsoft.com/v7.0/search"
+        headers = {"Ocp-Apim-Subscription-Key": key}
+        urls: List[str] = []
+        # page with offset when more than one API page is needed
+        for offset in range(0, count, _BING_MAX_COUNT):
+            params = {
+                "q": query,
+                "mkt": "en-US",
+                "count": min(count - offset, _BING_MAX_COUNT),
+                "offset": offset,
+            }
+            r = HTTP.get(endpoint, headers=headers, params=params, timeout=20)
+            r.raise_for_status()
+            page = [v["url"] for v in (r.json().get("webPages") or {}).get("value", []) if v.get("url")]
+            urls += page
+            if len(page) < params["count"]:
+                break  # no further results
+        return [u for u in urls if looks_like_business_site(u)][:count]
+    except Exception:
+        return []
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def search_serp_api(
+    query: str,
+    base_url: str,
+    key: str,
+    method: str = "GET",
+    auth_header: Optional[str] = "X-API-KEY",
+    key_param: Optional[str] = None,
+    count: int = 20,
+) -> List[str]:
+    if not base_url or not key:
+        return []
+    try:
+        # session headers (UA etc.) are inherited; only the auth key is per-call
+        headers = {auth_header: key} if auth_header else None
+        params = {"q": query, "count": count}
+        if key_param:
+            params[key_param] = key
+
+        if method.upper() == "POST":
+            r = HTTP.post(base_url, headers=headers, json=params, timeout=25)
+        else:
+            r = HTTP.get(base_url, headers=headers, params=params, timeout=25)
+
+        r.raise_for_status()
+        data = r.json()
+        urls: List[str] = []
+
+        if isinstance(data, dict):
+            if "webPages" in data and isinstance(data["webPages"], dict) and "value" in data["webPages"]:
+                urls = [v.get("url") for v in data["webPages"]["value"] if v.get("url")]
+            elif "results" in data and isinstance(data["results"], list):
+                for item in data["results"]:
+                    u = (item.get("url") or item.get("link"))
+                    if u:
+                        urls.append(u)
+        elif isinstance(data, list):
+            for item in data:
+                if isinstance(item, str):
+                    urls.append(item)
+                elif isinstance(item, dict):
+                    u = (item.get("url") or item.get("link"))
+                    if u:
+                        urls.append(u)
+
+        return [u for u in urls if u and looks_like_business_site(u)][:count]
+    except Exception:
+        return []
+
+# ---------------------- Unlocker fetch ----------------------
+@st.cache_data(show_spinner=False, ttl=3600)
+def unlocker_fetch(
+    url: str,
+    unlocker_base: str,
+    key: str,
+    key_header: Optional[str] = "X-API-KEY",
+    key_param: Optional[str] = None,
+) -> Optional[str]:
+    try:
+        headers = {key_header: key} if key_header else None
+        params = {"url": url}
+        if key_param:
+            params[key_param] = key
+        r = HTTP.get(unlocker_base, headers=headers, params=params, timeout=30)
+        r.raise_for_status()
+        if r.headers.get("Content-Type", "").startswith("application/json"):
+            j = r.json()
+            return j.get("html")
+        return r.text
+    except Exception:
+        return None
+
+# ---------------------- Extraction ----------------------
+_PHONE_NODE_SELECTOR = '[itemprop="telephone"], a[href^="tel:"], .phone, .tel'
+_ORG_NAME_SELECTOR = '[itemtype*="schema.org/Organization"] [itemprop="name"]'
+
+def _dom_bits_bs4(html: str):
+    """mailto hrefs, phone-node texts, h1, org name, flattened text — via BeautifulSoup."""
+    soup = BeautifulSoup(html, BS_PARSER)
+    mailto = [
+        a.get("href", "").replace("mailto:", "").strip()
+        for a in soup.select('a[href^="mailto:"]')
+        if a.get("href")
+    ]
+    phone_nodes = soup.select(_PHONE_NODE_SELECTOR)
+    phone_candidates = [n.get_text(" ", strip=True) for n in phone_nodes] if phone_nodes else []
+    h1 = soup.find("h1")
+    h1_txt = h1.get_text(strip=True)[:120] if h1 and h1.get_text(strip=True) else None
+    org = soup.select_one(_ORG_NAME_SELECTOR)
+    org_txt = org.get_text(strip=True)[:120] if org else None
+    return mailto, phone_candidates, h1_txt, org_txt, soup.get_text(" ", strip=True)
+
+def _dom_bits_selectolax(html: str):
+    """Same fields as _dom_bits_bs4, via the much faster selectolax C engine."""
+    tree = _SelectolaxParser(html)
+    mailto = [
+        (a.attributes.get("href") or "").replace("mailto:", "").strip()
+        for a in tree.css('a[href^="mailto:"]')
+    ]
+    phone_candidates = [n.text(separator=" ").strip() for n in tree.css(_PHONE_NODE_SELECTOR)]
+    h1 = tree.css_first("h1")
+    h1_txt = h1.text(separator=" ").strip()[:120] if h1 and h1.text(separator=" ").strip() else None
+    org = tree.css_first(_ORG_NAME_SELECTOR)
+    org_txt = org.text(separator=" ").strip()[:120] if org else None
+    body = tree.body or tree.root
+    text = body.text(separator=" ") if body else ""
+    return mailto, phone_candidates, h1_txt, org_txt, text
+
+def extract_company_info_from_html(html: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    if not html:
+        return None, None, None
+
+    # Fast path: most pages carry no email at all — cheap raw-HTML checks
+    # decide that without building a DOM
+    if "mailto:" not in html and not EMAIL_RE.search(html):
+        title = _title_from_html(html) or ""
+        title_main = TITLE_SEP_RE.split(title, maxsplit=1)[0].strip()[:120] if title else None
+        pm = PHONE_RE.search(html)
+        return title_main, None, pm.group() if pm else None
+
+    if _SelectolaxParser is not None:
+        mailto, phone_candidates, h1_txt, org_txt, text = _dom_bits_selectolax(html)
+    else:
+        mailto, phone_candidates, h1_txt, org_txt, text = _dom_bits_bs4(html)
+
+    # Email: prefer explicit mailto: links, then page text
+    mailto = [e.split("?")[0] for e in mailto if EMAIL_RE.match(e)]
+    mailto = [e for e in mailto if not is_noise_email(e)]
+
+    # One combined scan of the text picks up both emails and phones
+    phones = phone_candidates[:]
+    emails_in_text: List[str] = []
+    for m in CONTACT_RE.finditer(text):
+        if m.lastgroup == "email":
+            if not is_noise_email(m.group()):
+                emails_in_text.append(m.group())
+        else:
+            phones.append(m.group())
+
+    # Company: title | h1 | schema.org Organization name
+    title = _title_from_html(html) or ""
+    title_main = TITLE_SEP_RE.split(title, maxsplit=1)[0].strip()[:120] if title else None
+
+    company = _first_non_empty(title_main, h1_txt, org_txt)
+
+    # Final picks
+    email = _first_non_empty(*(mailto or []))
+    if not email:
+        email = _first_non_empty(*(emails_in_text or []))
+
+    phone = _first_non_empty(*(phones or []))
+
+    return company, email, phone
+
+CONTACT_PATHS = ("", "/contact", "/contact-us", "/contactus", "/about", "/team", "/contacts")
+MAX_HTML_BYTES = 512 * 1024  # contact info lives near the top of the page
+
+def fetch_html(url: str, timeout=(5, 15)) -> Optional[str]:
+    """GET a page, streaming at most MAX_HTML_BYTES, and decode it."""
+    try:
+        with HTTP.get(url, timeout=timeout, stream=True) as r:
+            r.raise_for_status()
+            ctype = r.headers.get("Content-Type", "")
+            if ctype and "html" not in ctype and "text" not in ctype:
+                return None  # PDFs, images, etc. — nothing to extract
+            buf = bytearray()
+            for chunk in r.iter_content(65536):
+                buf.extend(chunk)
+                if len(buf) >= MAX_HTML_BYTES:
+                    break
+            return bytes(buf).decode(r.encoding or "utf-8", errors="replace")
+    except Exception:
+        return None
+
+# hrefs worth trying before the blind CONTACT_PATHS fallback
+_CONTACT_HREF_RE = re.compile(r'href=["\']([^"\']*(?:contact|about|team)[^"\']*)["\']', re.I)
+
+# domain -> path that last yielded an email there; lives for the process,
+# which spans Streamlit reruns
+_BEST_CONTACT_PATH: dict = {}
+
+def _contact_links(html: str, root: str) -> List[str]:
+    """Internal links from a homepage that look like contact/about pages."""
+    domain = domain_of(root)
+    links: List[str] = []
+    for href in _CONTACT_HREF_RE.findall(html):
+        href = unescape(href)
+        if href.startswith(("mailto:", "tel:", "#", "javascript:")):
+            continue
+        if href.startswith("http"):
+            if domain_of(href) != domain:
+                continue
+            url = href
+        else:
+            url = root + "/" + href.lstrip("/")
+        if url not in links:
+            links.append(url)
+        if len(links) >= 3:
+            break
+    return links
+
+def probe_site(
+    base: str,
+    unlocker_base: str = "",
+    unlocker_key: str = "",
+    key_header: Optional[str] = "X-API-KEY",
+    key_param: Optional[str] = None,
+    rate_delay: float = 0.0,
+):
+    """Probe one site for contact info, cheapest page first.
+
+    Fetches the homepage once; if it already carries an email we are done.
+    Otherwise the contact-ish links found *in* the homepage are tried before
+    falling back to the blind CONTACT_PATHS guesses, so most sites cost one
+    or two requests instead of seven.
+    """
+    root = base.rstrip("/")
+
+    def fetch(url):
+        html = None
+        if unlocker_base and unlocker_key:
+            html = unlocker_fetch(url, unlocker_base, unlocker_key,
+                                  key_header=key_header, key_param=key_param)
+        return html or fetch_html(url)
+
+    home_html = fetch(root)
+    name = email = phone = None
+    if home_html:
+        name, email, phone = extract_company_info_from_html(home_html)
+        if email:
+            return name, email, phone
+
+    domain = domain_of(root)
+    candidates = []
+    # a path that paid off for this domain before goes first on revisits
+    best = _BEST_CONTACT_PATH.get(domain)
+    if best:
+        candidates.append(root + best)
+    candidates += _contact_links(home_html, root) if home_html else []
+    candidates += [root + p for p in CONTACT_PATHS[1:]]
+
+    seen = {root}
+    for url in candidates:
+        if url in seen:
+            continue
+        seen.add(url)
+        if rate_delay:
+            time.sleep(rate_delay)
+        html = fetch(url)
+        if not html:
+            continue
+        n, e, p = extract_company_info_from_html(html)
+        name = name or n
+        phone = phone or p
+        if e:
+            if domain and url.startswith(root):
+                _BEST_CONTACT_PATH[domain] = url[len(root):]
+            return name or n, e, phone or p
+    return name, email, phone
+
+def extract_company_info(
+    url: str,
+    unlocker_base: str = "",
+    unlocker_key: str = "",
+    key_header: Optional[str] = "X-API-KEY",
+    key_param: Optional[str] = None,
+):
+    html = None
+    if unlocker_base and unlocker_key:
+        html = unlocker_fetch(url, unlocker_base, unlocker_key, key_header=key_header, key_param=key_param)
+    if not html:
+        html = fetch_html(url)
+        if not html:
+            return None, None, None
+    return extract_company_info_from_html(html)